@@ -8,71 +8,140 @@ Measures performance of:
 Process:
 1. Builds Roman samples (1–3999) if needed
 2. Runs repeated conversions (Roman → Integer)
-3. Averages execution time across N iterations
+3. Discards one warmup run, then times N iterations
+4. Reports mean, median and p95 execution time
+
+Benchmark numbers require the optimized build (-O2 -march=native -flto).
+-debug builds with -O0 -g instead and is only meant for debugging the tool.
+The flags of each build are recorded, so the next run without -debug
+recompiles the optimized build, and the results report which one was timed.
+
+By default the validators are called in-process through a shared library
+build of converter.c (ctypes), so the numbers measure the validators and
+not process creation. -subprocess times the converter CLI instead.
 
 Usage:
     python benchmark.py           # Run benchmark
     python benchmark.py -r        # Rebuild binary and regenerate romans.json
+    python benchmark.py -debug    # Rebuild with -O0 -g before benchmarking
+    python benchmark.py -subprocess       # Benchmark the converter CLI
+    python benchmark.py -max-parallel 4   # Limit concurrent converter processes (-subprocess)
+    python benchmark.py --iterations 10 --warmup 2
 
 Author: Daniel Landuche
 """
 
-import json, sys, subprocess, os, platform, time
+import argparse, ctypes, json, subprocess, os, platform, statistics, threading, time
+
+# orjson is optional, it only speeds up reading and writing romans.json
+try:
+    import orjson
+    json_loads, json_dumps = orjson.loads, orjson.dumps
+except ImportError:
+    json_loads = json.loads
+    def json_dumps(obj):
+        return json.dumps(obj).encode()
 
 EXIT_OK = 0
 
+PLATFORM = platform.system()
+IS_WINDOWS = PLATFORM == "Windows"
+
 ROOT = os.path.dirname(os.path.abspath(__file__))
 SOURCE_FILE = os.path.join(ROOT, "converter.c")
 BINARY_FILE = os.path.join(
     ROOT,
-    "converter.exe" if platform.system() == "Windows" else "converter"
+    "converter.exe" if IS_WINDOWS else "converter"
+)
+LIB_FILE = os.path.join(
+    ROOT,
+    "converter.dll" if IS_WINDOWS else "libconverter.so"
 )
 ROMANS_FILE = os.path.join(ROOT, "romans.json")
 
+INT_CONVERTER_PROMPT = "Enter a number up to 3999 or 'Q' to quit: "
+
+BATCH_MANUAL = [BINARY_FILE, "-batch"]
+BATCH_REGEX = [BINARY_FILE, "-batch", "-regex"]
+
+# close_fds=False keeps CPython on the posix_spawn (vfork) path on Linux.
+# Pipes are created non-inheritable, so no descriptors leak into children.
+SPAWN_OPTIONS = {} if IS_WINDOWS else {"close_fds": False}
+
+MAX_PARALLEL = os.cpu_count() or 1
+
+# Optimized build by default, -debug builds without optimization for gdb
+OPTIMIZE_FLAGS = ["-O2", "-march=native", "-flto"]
+DEBUG_FLAGS = ["-O0", "-g"]
+
 def main():
-    args = set(sys.argv)
-    rebuild = any(flag in args for flag in ("-r", "-rebuild"))
-    iterations = 5
+    args = parse_args()
+    rebuild = args.rebuild
+    use_subprocess = args.subprocess
+    debug = args.debug
+    max_parallel = args.max_parallel
+    iterations = args.iterations
+
+    if rebuild or needs_rebuild(debug):
+        compile(debug)
 
-    if rebuild:
-        compile()
+    if rebuild or not os.path.exists(ROMANS_FILE):
         generate_romans()
 
-    if not os.path.exists(BINARY_FILE):
-        compile()
+    # Loaded once, outside of every timed region
+    with open(ROMANS_FILE, "rb") as f:
+        romans = json_loads(f.read())
 
-    if not os.path.exists(ROMANS_FILE):
-        generate_romans()
+    # Older fixtures stored [roman, value] pairs, keep only the numerals
+    if romans and isinstance(romans[0], list):
+        romans = [roman for roman, _ in romans]
+        write_romans(romans)
+
+    if use_subprocess:
+        def run(regex, label):
+            return benchmark(romans, regex, label, max_parallel)
+    else:
+        lib = load_library()
+        encoded = [roman.encode("ascii") for roman in romans]
+        def run(regex, label):
+            return benchmark_library(lib, encoded, regex, label)
 
     print("Running benchmarks...")
 
     manual_times = []
     regex_times = []
 
-    if platform.system() == "Windows":
+    if IS_WINDOWS:
         print("Regex validator not available on Windows")
 
+    # Untimed warmup so the first run doesn't pay for cold caches
+    for i in range(args.warmup):
+        print(f"Warmup {i+1}/{args.warmup}:")
+        if not IS_WINDOWS:
+            run(True, "Regex  warmup")
+        run(False, "Manual warmup")
+
     for i in range(iterations):
         print(f"Run {i+1}/{iterations}:")
 
-        if platform.system() != "Windows":
-            regex_time = benchmark(True, f"Regex  {i+1}")
+        if not IS_WINDOWS:
+            regex_time = run(True, f"Regex  {i+1}")
             regex_times.append(regex_time)
 
-        manual_time = benchmark(False, f"Manual {i+1}")
+        manual_time = run(False, f"Manual {i+1}")
         manual_times.append(manual_time)
 
-    manual_avg = sum(manual_times) / len(manual_times)
+    manual_avg, manual_median, manual_p95 = summarize(manual_times)
 
     print("\n" + "="*50)
     print("BENCHMARK RESULTS")
     print("="*50)
-    print(f"Manual Validator: {manual_avg:.2f}s average")
+    print(f"Manual Validator: {manual_avg:.4f}s average | {manual_median:.4f}s median | {manual_p95:.4f}s p95")
 
     if regex_times:
-        regex_avg = sum(regex_times) / len(regex_times)
+        regex_avg, regex_median, regex_p95 = summarize(regex_times)
         delta = ((regex_avg - manual_avg) / regex_avg) * 100
-        print(f"Regex Validator:  {regex_avg:.2f}s average")
+        print(f"Regex Validator:  {regex_avg:.4f}s average | {regex_median:.4f}s median | {regex_p95:.4f}s p95")
         if delta > 0:
             print(f"Manual was {delta:.1f}% faster than Regex")
         elif delta < 0:
@@ -80,57 +149,171 @@ def main():
         else:
             print("Both validators have identical performance")
 
-    print(f"Platform: {platform.system()}")
+    print(f"Platform: {PLATFORM}")
+    print(f"Mode: {'converter subprocess' if use_subprocess else 'in-process library'}")
+    print(f"Build: {'debug' if debug else 'optimized'} ({' '.join(DEBUG_FLAGS if debug else OPTIMIZE_FLAGS)})")
     print(f"Test: Int→Roman conversion (1-3999), {iterations} iterations")
 
 
+def parse_args():
+    # Single-dash spellings are kept for compatibility with earlier versions
+    parser = argparse.ArgumentParser(description="Roman Numeral Converter benchmark tool")
+    parser.add_argument("-r", "-rebuild", "--rebuild", action="store_true",
+                        help="rebuild the converter and regenerate romans.json")
+    parser.add_argument("-debug", "--debug", action="store_true",
+                        help="rebuild with -O0 -g instead of the optimized flags")
+    parser.add_argument("-subprocess", "--subprocess", action="store_true",
+                        help="benchmark the converter CLI instead of the in-process library")
+    parser.add_argument("-max-parallel", "--max-parallel", type=int, default=MAX_PARALLEL,
+                        help="concurrent converter processes with -subprocess (default: CPU count)")
+    parser.add_argument("-iterations", "--iterations", type=int, default=5,
+                        help="timed runs per validator (default: 5)")
+    parser.add_argument("-warmup", "--warmup", type=int, default=1,
+                        help="untimed runs per validator before timing (default: 1)")
+    args = parser.parse_args()
+
+    if args.max_parallel < 1:
+        parser.error("--max-parallel must be at least 1")
+    if args.iterations < 1:
+        parser.error("--iterations must be at least 1")
+    if args.warmup < 0:
+        parser.error("--warmup cannot be negative")
+
+    return args
+
+
+def summarize(times):
+    # quantiles() needs at least two samples. "inclusive" interpolates between
+    # observed runs, so p95 never exceeds the slowest one.
+    p95 = statistics.quantiles(times, n=20, method="inclusive")[18] if len(times) > 1 else times[0]
+    return statistics.mean(times), statistics.median(times), p95
+
+
 def generate_romans():
     print(f"Generating Roman numerals...")
+    payload = "".join(f"2\n{i}\n" for i in range(1, 4000)) + "Q\n"
+    result = subprocess.run(BATCH_MANUAL, input=payload, capture_output=True, text=True,
+                            **SPAWN_OPTIONS)
+    # Each conversion starts with its prompt, failed ones leave an empty chunk
+    outputs = [chunk.strip() for chunk in result.stdout.split(INT_CONVERTER_PROMPT)[1:]]
+
+    # Flat list of numerals, the value of romans[i] is i + 1
     romans = []
     for i in range(1, 4000):
-        result = subprocess.run([BINARY_FILE, "-test"], input=f"2\n{i}\n", capture_output=True, text=True)
-        roman = result.stdout.replace("Enter a number up to 3999 or 'Q' to quit: ", "").strip()
+        roman = outputs[i - 1] if i <= len(outputs) else ""
         if roman:
-            romans.append((roman, str(i)))
+            romans.append(roman)
         else:
             raise RuntimeError(f"Failed to generate Roman numeral {i}")
 
-    with open(ROMANS_FILE, "w") as f:
-        json.dump(romans, f)
+    write_romans(romans)
 
 
-def benchmark(regex=False, label="Benchmark"):
-    start = time.time()
+def write_romans(romans):
+    with open(ROMANS_FILE, "wb") as f:
+        f.write(json_dumps(romans))
 
-    command = [BINARY_FILE, "-test"] + (["-regex"] if regex else [])
 
-    with open(ROMANS_FILE) as f:
-        romans = json.load(f)
+def benchmark(romans, regex=False, label="Benchmark", max_parallel=MAX_PARALLEL):
+    command = BATCH_REGEX if regex else BATCH_MANUAL
+    count = max(1, min(max_parallel, len(romans)))
 
-    # Run all conversions from 1 to 3999
-    for roman, value in romans:
-        result = subprocess.run(command, input=f"1\n{roman}\n",
-                              capture_output=True, text=True)
-        if result.returncode != EXIT_OK:
-            print(f"Error in conversion for {roman}: {result.stderr}")
+    start = time.time()
+
+    # Shard round-robin, one persistent converter process per shard
+    payloads = [("".join(f"1\n{roman}\n" for roman in romans[k::count]) + "Q\n").encode("ascii")
+                for k in range(count)]
+    # Only the exit code matters, stderr is kept raw and decoded on failure
+    workers = [subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE, bufsize=1 << 20, **SPAWN_OPTIONS)
+               for _ in range(count)]
+
+    # A thread per worker feeds its stdin and drains its stderr concurrently
+    errors = [b""] * count
+    def feed(k):
+        _, errors[k] = workers[k].communicate(payloads[k])
+    threads = [threading.Thread(target=feed, args=(k,)) for k in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for worker, err in zip(workers, errors):
+        if worker.returncode != EXIT_OK:
+            print(f"Error in conversion: {err.decode('ascii', 'replace')}")
 
     duration = time.time() - start
 
     # Progress indicator
-    print(f"  {label}: {duration:.2f}s")
+    print(f"  {label}: {duration:.4f}s")
+
+    return duration
+
+def benchmark_library(lib, romans, regex=False, label="Benchmark"):
+    validate = lib.regex_roman if regex else lib.validate_roman
+
+    start = time.time()
+
+    # Validate and convert every numeral directly, no process per conversion
+    for roman in romans:
+        if not validate(roman):
+            print(f"Error in conversion for {roman.decode('ascii')}")
+            continue
+        lib.roman_converter(roman)
+
+    duration = time.time() - start
+
+    print(f"  {label}: {duration:.4f}s")
 
     return duration
 
-def compile():
+def load_library():
+    lib = ctypes.CDLL(LIB_FILE)
+    lib.validate_roman.argtypes = [ctypes.c_char_p]
+    lib.validate_roman.restype = ctypes.c_bool
+    lib.roman_converter.argtypes = [ctypes.c_char_p]
+    lib.roman_converter.restype = ctypes.c_int
+    if not IS_WINDOWS:
+        lib.regex_roman.argtypes = [ctypes.c_char_p]
+        lib.regex_roman.restype = ctypes.c_bool
+    return lib
+
+def needs_rebuild(debug=False):
+    # Missing, older than converter.c, or built with other flags
+    flags = " ".join(DEBUG_FLAGS if debug else OPTIMIZE_FLAGS)
+    for output in (BINARY_FILE, LIB_FILE):
+        if not os.path.exists(output) or os.path.getmtime(SOURCE_FILE) > os.path.getmtime(output):
+            return True
+        if build_flags(output) != flags:
+            return True
+    return False
+
+def build_flags(output):
+    # compile() records the optimization flags next to each output
+    try:
+        with open(output + ".flags") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def compile(debug=False):
     print(f"Compiling converter.c...")
-    result = subprocess.run(["gcc", "-Wall", "-Werror", SOURCE_FILE, "-o", BINARY_FILE],
-                          text=True, capture_output=True)
-    if result.returncode != EXIT_OK:
-        output = "\n".join(line for line in result.stderr.splitlines()
-                          if not (line.startswith("cc1.exe:") or line.startswith("cc1:")))
-        print(output)
-        print(f"Compilation failed.")
-        exit(1)
+    optimization = DEBUG_FLAGS if debug else OPTIMIZE_FLAGS
+    # The CLI binary, plus a shared library exposing the validators to ctypes
+    builds = [
+        ["gcc"] + optimization + ["-Wall", "-Werror", SOURCE_FILE, "-o", BINARY_FILE],
+        ["gcc"] + optimization + ["-Wall", "-Werror", "-shared"] + ([] if IS_WINDOWS else ["-fPIC"]) + [SOURCE_FILE, "-o", LIB_FILE],
+    ]
+    for build in builds:
+        result = subprocess.run(build, text=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode != EXIT_OK:
+            output = "\n".join(line for line in result.stderr.splitlines()
+                              if not (line.startswith("cc1.exe:") or line.startswith("cc1:")))
+            print(output)
+            print(f"Compilation failed.")
+            exit(1)
+        with open(build[-1] + ".flags", "w") as f:
+            f.write(" ".join(optimization))
     print(f"Binary compiled successfully.")
 
 if __name__ == "__main__":
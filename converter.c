@@ -9,6 +9,7 @@
  * Usage:
  *   ./converter          # Interactive mode
  *   ./converter -test    # Automated test mode  
+ *   ./converter -batch   # Test mode, repeat conversions until 'Q'
  *   ./converter -regex   # Use regex validator (Unix systems)
  *
  * Platform Notes:
@@ -67,17 +68,23 @@ static bool cannot_repeat(int value, bool *v_repeat, bool *l_repeat, bool *d_rep
 int main(int argc, char *argv[])
 {
     bool test_mode = false;
+    bool batch_mode = false;
 
     for (int i = 1; i < argc; i++) {
         if (strcmp(argv[i], "-test") == 0) {
             test_mode = true;
         }
+        else if (strcmp(argv[i], "-batch") == 0) {
+            test_mode = true;
+            batch_mode = true;
+        }
         else if (strcmp(argv[i], "-regex") == 0) {
             use_regex = true;
         }
     }
 
     int status;
+    int batch_status = EXIT_OK;
 
     char buffer[MAIN_BUFFER_LENGTH];
     buffer[0] = '\0';
@@ -103,7 +110,8 @@ int main(int argc, char *argv[])
         {
             if (validation_status == EXIT_PROGRAM)
             {
-                return EXIT_PROGRAM;
+                // Batch mode reports the first failed conversion on quit
+                return batch_mode ? batch_status : EXIT_PROGRAM;
             }
             fprintf(stderr, "Invalid input.\n");
             return validation_status;
@@ -114,7 +122,17 @@ int main(int argc, char *argv[])
             do {
                 status = roman_to_int();
             } while (!test_mode && status != EXIT_PROGRAM);
-            if (test_mode) return status;
+            if (batch_mode)
+            {
+                if (batch_status == EXIT_OK)
+                {
+                    batch_status = status;
+                }
+            }
+            else if (test_mode)
+            {
+                return status;
+            }
         }
 
         else if (strcmp(buffer, "2") == 0)
@@ -122,7 +140,17 @@ int main(int argc, char *argv[])
             do {
                 status = int_to_roman();
             } while (!test_mode && status != EXIT_PROGRAM);
-            if (test_mode) return status;
+            if (batch_mode)
+            {
+                if (batch_status == EXIT_OK)
+                {
+                    batch_status = status;
+                }
+            }
+            else if (test_mode)
+            {
+                return status;
+            }
         }
 
         else
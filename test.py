@@ -12,11 +12,15 @@ Usage:
     python test.py -regex    # Test regex validator
     python test.py -v        # Verbose output mode
     python test.py -r        # Rebuild and test
+    python test.py -debug    # Test a -O0 -g build (the next normal run rebuilds optimized)
+    python test.py -max-parallel 4   # Limit concurrent converter processes
+    python test.py --help    # List all options
 
 Author: Daniel Landuche
 """
 
-import os, platform, subprocess, time, sys
+import argparse, os, platform, re, subprocess, time, sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 EXIT_OK = 0
 EXIT_INVALID_INPUT = 4
@@ -103,40 +107,108 @@ INVALID_INTS = [
     ("19.98", EXIT_INVALID_INPUT),
 ]
 
+IS_WINDOWS = platform.system() == "Windows"
+
 ROOT = os.path.dirname(os.path.abspath(__file__))
 SOURCE_FILE = os.path.join(ROOT, "converter.c")
 BINARY_FILE = os.path.join(
     ROOT,
-    "converter.exe" if platform.system() == "Windows" else "converter"
+    "converter.exe" if IS_WINDOWS else "converter"
 )
 
+CMD_MANUAL = [BINARY_FILE, "-test"]
+CMD_REGEX = [BINARY_FILE, "-test", "-regex"]
+BATCH_MANUAL = [BINARY_FILE, "-batch"]
+BATCH_REGEX = [BINARY_FILE, "-batch", "-regex"]
+
+# close_fds=False keeps CPython on the posix_spawn (vfork) path on Linux.
+# Pipes are created non-inheritable, so no descriptors leak into children.
+SPAWN_OPTIONS = {} if IS_WINDOWS else {"close_fds": False}
+
+# Reference spec for valid numerals, same pattern as the C regex validator
+ROMAN_RE = re.compile(r"^M{0,3}(CM|CD|D?C{0,3})(XC|XL|L?X{0,3})(IX|IV|V?I{0,3})$")
+
 ROMAN_CONVERTER_PROMPT = "Enter a Roman numeral or 'Q' to quit: "
 INT_CONVERTER_PROMPT = "Enter a number up to 3999 or 'Q' to quit: "
+ROMAN_PROMPT_LEN = len(ROMAN_CONVERTER_PROMPT)
+INT_PROMPT_LEN = len(INT_CONVERTER_PROMPT)
 
 MAX_ROMAN = 3999
-TOTAL_INVALID = len(INVALID_ROMANS + INVALID_INTS)
+TOTAL_INVALID = len(INVALID_ROMANS) + len(INVALID_INTS)
 TOTAL_VALID = MAX_ROMAN
 TOTAL_TESTS = TOTAL_INVALID + TOTAL_VALID
 
+INTEGERS = [str(i) for i in range(1, MAX_ROMAN + 1)]
+
+# Minimum round-trip shards, so progress still advances with a single worker
+MIN_SHARDS = 8
+
+MAX_PARALLEL = os.cpu_count() or 1
+
+# Optimized build by default, -debug builds without optimization for gdb
+OPTIMIZE_FLAGS = ["-O2", "-march=native", "-flto"]
+DEBUG_FLAGS = ["-O0", "-g"]
+
 def main():
-    args = set(sys.argv)
-    regex = True if "-regex" in args else False
-    rebuild = any(flag in args for flag in ("-r", "-rebuild"))
-    verbose = any(flag in args for flag in ("-v", "-verbose"))
+    args = parse_args()
+    regex = args.regex
+    rebuild = args.rebuild
+    verbose = args.verbose
+    debug = args.debug
+    max_parallel = args.max_parallel
 
-    if not os.path.exists(BINARY_FILE) or rebuild:
-        compile()
+    if rebuild or needs_rebuild(debug):
+        compile(debug)
 
-    passed = tester(verbose, regex)
+    passed = tester(verbose, regex, max_parallel)
 
     print(f"Summary: {passed}/{TOTAL_TESTS} tests passed {'✅' if passed == TOTAL_TESTS else '❌'}")
 
 
-def compile():
+def parse_args():
+    # Single-dash spellings are kept for compatibility with earlier versions
+    parser = argparse.ArgumentParser(description="Roman Numeral Converter test suite")
+    parser.add_argument("-regex", "--regex", action="store_true",
+                        help="test the regex validator")
+    parser.add_argument("-r", "-rebuild", "--rebuild", action="store_true",
+                        help="rebuild the converter before testing")
+    parser.add_argument("-v", "-verbose", "--verbose", action="store_true",
+                        help="print every test result")
+    parser.add_argument("-debug", "--debug", action="store_true",
+                        help="rebuild with -O0 -g instead of the optimized flags")
+    parser.add_argument("-max-parallel", "--max-parallel", type=int, default=MAX_PARALLEL,
+                        help="concurrent converter processes (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.max_parallel < 1:
+        parser.error("--max-parallel must be at least 1")
+
+    return args
+
+
+def needs_rebuild(debug = False):
+    # Missing, older than converter.c, or built with other flags
+    if not os.path.exists(BINARY_FILE) or os.path.getmtime(SOURCE_FILE) > os.path.getmtime(BINARY_FILE):
+        return True
+    return build_flags(BINARY_FILE) != " ".join(DEBUG_FLAGS if debug else OPTIMIZE_FLAGS)
+
+
+def build_flags(output):
+    # compile() records the optimization flags next to each output
+    try:
+        with open(output + ".flags") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def compile(debug = False):
     print(f"Compiling converter.c...")
-    result = subprocess.run(["gcc", "-Wall", "-Werror", SOURCE_FILE, "-o", BINARY_FILE],
+    optimization = DEBUG_FLAGS if debug else OPTIMIZE_FLAGS
+    result = subprocess.run(["gcc"] + optimization + ["-Wall", "-Werror", SOURCE_FILE, "-o", BINARY_FILE],
                             text=True,
-                            capture_output=True
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE
                             )
     if result.returncode != EXIT_OK:
         output = "\n".join(line for line in result.stderr.splitlines()
@@ -144,23 +216,25 @@ def compile():
         print(output)
         print(f"Compilation failed.")
         exit(1)
+    with open(BINARY_FILE + ".flags", "w") as f:
+        f.write(" ".join(optimization))
     print(f"Binary compiled successfully.")
 
 
-def tester(verbose = False, regex = False):
+def tester(verbose = False, regex = False, max_parallel = MAX_PARALLEL):
     start = time.time()
 
     if not verbose:
         print(f"Performing round-trip verification...")
-    round_trip_results = round_trip(verbose, regex)
+    round_trip_results = round_trip(verbose, regex, max_parallel)
 
     if not verbose:
         print(f"Testing invalid Romans...")
-    roman_results = test_loop(verbose, regex)
+    roman_results = test_loop(verbose, regex, 1, max_parallel)
 
     if not verbose:
         print(f"Testing invalid Integers...")
-    int_results = test_loop(verbose, regex, 2)
+    int_results = test_loop(verbose, regex, 2, max_parallel)
 
     duration = time.time() - start
 
@@ -175,18 +249,35 @@ def tester(verbose = False, regex = False):
 
     return roman_results + int_results + round_trip_results
 
-def round_trip(verbose = False, regex = False):
+def round_trip(verbose = False, regex = False, max_parallel = MAX_PARALLEL):
     passed = 0
 
-    command = [BINARY_FILE, "-test"] + (["-regex"] if regex else [])
+    command = BATCH_REGEX if regex else BATCH_MANUAL
+
+    def convert(shard):
+        # Int → Roman for the shard in one process, then Roman → Int in another
+        romans = run_batch(command, "2\n", shard, INT_CONVERTER_PROMPT)
+        integers = run_batch(command, "1\n", romans, ROMAN_CONVERTER_PROMPT)
+        return list(zip(romans, integers))
 
-    for i in range(1, 4000):
-        roman_result = subprocess.run(command, input=f"2\n{i}\n", capture_output=True, text=True)
-        roman = roman_result.stdout.replace(INT_CONVERTER_PROMPT, "").strip()
+    shards = shard_list(INTEGERS, max(max_parallel, MIN_SHARDS))
+    converted = [None] * len(shards)
+    done = 0
 
-        integer_result = subprocess.run([BINARY_FILE, "-test"], input=f"1\n{roman}\n", capture_output=True, text=True)
-        integer = integer_result.stdout.replace(ROMAN_CONVERTER_PROMPT, "").strip()
+    # Progress is reported from this thread as each shard finishes
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        futures = {executor.submit(convert, shard): k for k, shard in enumerate(shards)}
+        for future in as_completed(futures):
+            k = futures[future]
+            converted[k] = future.result()
+            done += len(shards[k])
+            if not verbose:
+                sys.stdout.write(f"\rProgress: {done}/3999")
+                sys.stdout.flush()
 
+    results = [pair for shard in converted for pair in shard]
+
+    for i, (roman, integer) in enumerate(results, start=1):
         try:
             assert integer == str(i) 
         except AssertionError:
@@ -197,10 +288,6 @@ def round_trip(verbose = False, regex = False):
         if verbose:
             print(f"✅ Test '{i:<20}' → Roman: {roman:40} | → Int: {integer}")
 
-        else:
-            sys.stdout.write(f"\rProgress: {i}/3999")
-            sys.stdout.flush()
-
         passed += 1
 
     if not verbose:
@@ -208,29 +295,81 @@ def round_trip(verbose = False, regex = False):
 
     return passed
 
-def test_loop(verbose = False, regex = False, option = 1):
+def run_batch(command, prefix, inputs, prompt):
+    """Feed every input to a single converter process and return one output per input."""
+    payload = ("".join(f"{prefix}{inp}\n" for inp in inputs) + "Q\n").encode("ascii")
+    result = subprocess.run(command, input=payload, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            **SPAWN_OPTIONS)
+    # Each conversion starts with its prompt, failed ones leave an empty chunk
+    outputs = [chunk.strip() for chunk in result.stdout.decode("ascii").split(prompt)[1:]]
+    return outputs + [""] * (len(inputs) - len(outputs))
+
+def strip_prompt(output, prompt, prompt_len):
+    # The converter prints its prompt first, so a slice usually replaces the search
+    if output.startswith(prompt):
+        return output[prompt_len:].strip()
+    return output.replace(prompt, "").strip()
+
+def shard_list(items, count):
+    # Contiguous slices so results can be joined back in input order
+    size = -(-len(items) // max(1, min(count, len(items))))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def test_loop(verbose = False, regex = False, option = 1, max_parallel = MAX_PARALLEL):
     passed = 0
 
-    command = [BINARY_FILE, "-test"]
+    command = CMD_MANUAL
 
     if option == 1:
         prompt = ROMAN_CONVERTER_PROMPT
+        prompt_len = ROMAN_PROMPT_LEN
         prefix = "1\n"
         tests = INVALID_ROMANS
         if regex:
-            command.append("-regex")
+            command = CMD_REGEX
+
+        # Catch fixture regressions before spawning anything, the converter upper-cases its input
+        for inp, _ in tests:
+            if ROMAN_RE.match(inp.upper()):
+                print(f" ❌ Test '{inp:<20}' is a valid Roman numeral, fix INVALID_ROMANS")
+                sys.exit(1)
 
     elif option == 2:
         prompt = INT_CONVERTER_PROMPT
+        prompt_len = INT_PROMPT_LEN
         prefix = "2\n"
         tests = INVALID_INTS
 
     total_tests = len(tests)
-
-    for idx, (inp, expected_code) in enumerate(tests, start=1):
-        result = subprocess.run([BINARY_FILE, "-test"], input=f"{prefix}{inp}\n", capture_output=True, text=True)
-        output = (result.stdout + result.stderr).replace(prompt, "").strip()
+    prefix_bytes = prefix.encode("ascii")
+
+    def run(inp):
+        return subprocess.run(command, input=prefix_bytes + inp.encode("ascii") + b"\n", capture_output=True,
+                              **SPAWN_OPTIONS)
+
+    results = [None] * total_tests
+    done = 0
+
+    # Each input needs its own process to check its exit code, so run them concurrently
+    # and report progress from this thread as each one finishes
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        futures = {executor.submit(run, inp): k for k, (inp, _) in enumerate(tests)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            done += 1
+            if not verbose:
+                sys.stdout.write(f"\rProgress: {done}/{total_tests}")
+                sys.stdout.flush()
+
+    for idx, ((inp, expected_code), result) in enumerate(zip(tests, results), start=1):
         code = result.returncode
+
+        if expected_code == code and not verbose:
+            passed += 1
+            continue
+
+        # Output is only decoded when it is actually reported
+        output = strip_prompt((result.stdout + result.stderr).decode("ascii", "replace"), prompt, prompt_len)
         code_name = EXIT_CODES.get(code, f"UNKNOWN ({code})")
         expected_code_name = EXIT_CODES.get(expected_code, "UNKNOWN")
 
@@ -238,12 +377,7 @@ def test_loop(verbose = False, regex = False, option = 1):
             print(f" ❌ Test '{inp:<20}' → Result: {output:40} | → Return code: {code_name} | → Expected code: {expected_code_name}")
             continue
 
-        if verbose:
-            print(f"✅ Test '{inp:<20}' → Result: {output:40} | → Return code: {code_name}")
-
-        else:
-            sys.stdout.write(f"\rProgress: {idx}/{total_tests}")
-            sys.stdout.flush()
+        print(f"✅ Test '{inp:<20}' → Result: {output:40} | → Return code: {code_name}")
 
         passed += 1
     if not verbose: